@@ -3,16 +3,27 @@ import json
 import math
 import time
 import base64
+import heapq
+import threading
 import re
 import traceback
-from xml.sax.saxutils import escape
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from functools import lru_cache
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, FrozenSet, Iterator, List, Tuple, Any, Optional
 
 import requests
 import gspread
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson  # optional: faster parsing of Rakuten responses
+except ImportError:
+    orjson = None
 
 
 # =========================
@@ -43,6 +54,11 @@ RANKING_N = int(os.environ.get("RANKING_N", "20"))
 HERO_K = int(os.environ.get("HERO_K", "3"))
 
 REQUEST_SLEEP_SEC = float(os.environ.get("REQUEST_SLEEP_SEC", "1.0"))
+RAKUTEN_CONCURRENCY = int(os.environ.get("RAKUTEN_CONCURRENCY", "4"))  # masters fetched in parallel
+# Rakuten page requests per second (all threads). Default: one request per REQUEST_SLEEP_SEC (~1 req/s per app ID).
+# 0 (or REQUEST_SLEEP_SEC=0 when RAKUTEN_QPS is unset) disables pacing.
+_RAKUTEN_QPS_ENV = os.environ.get("RAKUTEN_QPS", "").strip()
+RAKUTEN_QPS = float(_RAKUTEN_QPS_ENV) if _RAKUTEN_QPS_ENV else (1.0 / REQUEST_SLEEP_SEC if REQUEST_SLEEP_SEC > 0 else 0.0)
 STRICT_MODE = os.environ.get("STRICT_MODE", "false").strip().lower() in {"1", "true", "yes", "on"}
 TRACK_DROP_ALERT_RATIO = float(os.environ.get("TRACK_DROP_ALERT_RATIO", "0.5"))
 TRACK_DROP_ALERT_MIN_DELTA = int(os.environ.get("TRACK_DROP_ALERT_MIN_DELTA", "3"))
@@ -63,6 +79,25 @@ EXCLUDE_KEYWORDS = [k.strip() for k in os.environ.get(
     "BCAA,EAA,クレアチン,アミノ酸,"
     "シェイク,ドリンク,飲料,缶,紙パック"
 ).split(",") if k.strip()]
+# One alternation scan per item name instead of len(EXCLUDE_KEYWORDS) substring scans
+EXCLUDE_RE = re.compile("|".join(re.escape(k) for k in EXCLUDE_KEYWORDS)) if EXCLUDE_KEYWORDS else None
+
+# Price_History append batch size (rows per append_rows request)
+HISTORY_APPEND_CHUNK_ROWS = 500
+
+# Marketing report persona slots (heading, condition); slot N shows ranking_offers[N-1]
+PERSONA_SLOTS: Tuple[Tuple[str, str], ...] = (
+    ("コスパ重視で最安を狙う人", "実質単価を最優先で比較したい"),
+    ("初めて買う人", "まずは定番の売れ筋から失敗を避けたい"),
+    ("毎日飲んで消費が早い人", "価格変動の前にまとめて確保したい"),
+    ("ポイント還元を活用したい人", "セールとポイント倍率を合わせて得したい"),
+    ("送料を抑えたい人", "本体価格だけでなく送料込みで判断したい"),
+    ("お気に入りのショップで買いたい人", "レビューや対応が安定した店舗を選びたい"),
+    ("最短で補充したい人", "在庫切れ前に今すぐ購入したい"),
+    ("品質を重視する人", "価格だけでなく人気商品を優先したい"),
+    ("価格下落タイミングを待っていた人", "今日の値下がりを確認して動きたい"),
+    ("迷っていて最後の一押しが欲しい人", "比較結果を見てすぐ決めたい"),
+)
 
 # Capacity strict match is REQUIRED per your final spec
 STRICT_CAPACITY_MATCH = True
@@ -74,16 +109,20 @@ RAKUTEN_ENDPOINT = "https://app.rakuten.co.jp/services/api/IchibaItem/Search/202
 # =========================
 # Data models
 # =========================
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MasterItem:
     canonical_id: str
     search_keyword: str
     brand: str
     capacity_kg: float
     protein_ratio: float  # 0.70 for 70% etc
+    protein_kg: float = field(init=False, repr=False)  # protein per package (protein_cost denominator)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "protein_kg", self.capacity_kg * self.protein_ratio)
 
 
-@dataclass
+@dataclass(slots=True)
 class CatalogItem:
     canonical_id: str
     brand: str
@@ -92,7 +131,7 @@ class CatalogItem:
     search_keyword: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OfferRow:
     date: str
     canonical_id: str
@@ -107,61 +146,114 @@ class OfferRow:
     image_url: str
 
 
+@dataclass(slots=True, frozen=True)
+class RawItem:
+    # Fields the filter needs, parsed once per Rakuten item; the rest stays in `item`
+    item_code: str
+    shop_name: str
+    item_name: str
+    raw_price: int
+    item: Dict[str, Any]
+
+
+@dataclass(slots=True, frozen=True)
+class ScoredItem:
+    # Accepted item with its cost; OfferRow is only built for the STORE_HITS cheapest
+    raw: RawItem
+    shipping_cost: int
+    point_rate: float
+    protein_cost: float
+
+
+# =========================
+# HTTP
+# =========================
+def build_http_session() -> requests.Session:
+    """
+    Shared keep-alive session for Rakuten / Discord / Hatena.
+    Idempotent requests (GET) are retried on 429/5xx; POSTs are never retried.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(8, RAKUTEN_CONCURRENCY), max_retries=retry)
+    session = requests.Session()
+    session.headers.update({"User-Agent": "protein-hunter/1.0"})
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+HTTP_SESSION = build_http_session()
+
+
+class RateLimiter:
+    """
+    Thread-safe pacing: hands out one slot every 1/rate seconds.
+    Callers only sleep until their slot, so time already spent waiting on
+    the network counts toward the interval.
+    """
+
+    def __init__(self, rate_per_sec: float):
+        self._interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_at)
+            self._next_at = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+RAKUTEN_LIMITER = RateLimiter(RAKUTEN_QPS)
+
+def loads_json_bytes(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
 # =========================
 # Helpers
 # =========================
+JST = ZoneInfo("Asia/Tokyo")
+WEEKDAY_NAMES_JA = ("月", "火", "水", "木", "金", "土", "日")  # Mon=0..Sun=6
+
+
 def jst_date() -> datetime.date:
-    return datetime.now(ZoneInfo("Asia/Tokyo")).date()
+    return datetime.now(JST).date()
 
 def jst_today_str() -> str:
     return jst_date().isoformat()
 
 def jst_now_iso() -> str:
-    return datetime.now(ZoneInfo("Asia/Tokyo")).isoformat(timespec="seconds")
+    return datetime.now(JST).isoformat(timespec="seconds")
+
+
+# variant -> (variant, headline, reason, push_text)
+VARIANT_COPY: Dict[str, Tuple[str, str, str, str]] = {
+    "A": ("A", "今日が買い時", "30日最安水準", "補充する人は今日が安全。ポイント条件だけ確認してGO。"),
+    "B": ("B", "逃すと損しやすい水準", "急落後は戻りやすい", "この水準は長く続かないことが多い。売り切れ前に確認。"),
+}
 
 
 def choose_variant_jst(now: Optional[datetime] = None) -> Tuple[str, str, str, str, str, str]:
-    dt = now.astimezone(ZoneInfo("Asia/Tokyo")) if now else datetime.now(ZoneInfo("Asia/Tokyo"))
+    # Already-JST datetimes skip the astimezone conversion
+    dt = (now if now.tzinfo is JST else now.astimezone(JST)) if now else datetime.now(JST)
     weekday = dt.weekday()  # Mon=0..Sun=6
-    weekday_names = ["月", "火", "水", "木", "金", "土", "日"]
-    forced_variant = os.environ.get("FORCE_VARIANT", "").strip().upper()
-
-    if forced_variant == "A":
-        return (
-            "A",
-            "今日が買い時",
-            "30日最安水準",
-            "補充する人は今日が安全。ポイント条件だけ確認してGO。",
-            dt.date().isoformat(),
-            weekday_names[weekday],
-        )
-    if forced_variant == "B":
-        return (
-            "B",
-            "逃すと損しやすい水準",
-            "急落後は戻りやすい",
-            "この水準は長く続かないことが多い。売り切れ前に確認。",
-            dt.date().isoformat(),
-            weekday_names[weekday],
-        )
+    variant = os.environ.get("FORCE_VARIANT", "").strip().upper()
+    if variant not in VARIANT_COPY:
+        variant = "A" if weekday in {0, 2, 4} else "B"  # Mon/Wed/Fri
+    return VARIANT_COPY[variant] + (dt.date().isoformat(), WEEKDAY_NAMES_JA[weekday])
 
-    if weekday in {0, 2, 4}:  # Mon/Wed/Fri
-        return (
-            "A",
-            "今日が買い時",
-            "30日最安水準",
-            "補充する人は今日が安全。ポイント条件だけ確認してGO。",
-            dt.date().isoformat(),
-            weekday_names[weekday],
-        )
-    return (
-        "B",
-        "逃すと損しやすい水準",
-        "急落後は戻りやすい",
-        "この水準は長く続かないことが多い。売り切れ前に確認。",
-        dt.date().isoformat(),
-        weekday_names[weekday],
-    )
+
+_IMAGE_EX_RE = re.compile(r"([?&])_ex=\d+x\d+")
 
 
 def normalize_image_url(url: str) -> str:
@@ -171,86 +263,148 @@ def normalize_image_url(url: str) -> str:
 
     if image_url.startswith("//"):
         image_url = f"https:{image_url}"
+    elif image_url[:7].lower() == "http://":
+        image_url = f"https://{image_url[7:]}"
 
-    image_url = re.sub(r"^http://", "https://", image_url, flags=re.IGNORECASE)
+    # Already at the target size with no other _ex parameter: nothing to rewrite
+    if image_url.endswith(("?_ex=600x600", "&_ex=600x600")) and image_url.count("_ex=") == 1:
+        return image_url
 
-    if re.search(r"([?&])_ex=\d+x\d+", image_url):
-        image_url = re.sub(r"([?&])_ex=\d+x\d+", r"\1_ex=600x600", image_url)
-    else:
-        image_url = f"{image_url}&_ex=600x600" if "?" in image_url else f"{image_url}?_ex=600x600"
+    # One regex pass (skipped when there is no _ex at all): rewrite the size, or append one
+    replaced = 0
+    if "_ex=" in image_url:
+        image_url, replaced = _IMAGE_EX_RE.subn(r"\1_ex=600x600", image_url)
+    if not replaced:
+        sep = "&" if "?" in image_url else "?"
+        image_url = f"{image_url}{sep}_ex=600x600"
 
     return image_url
 
 
+# Item image fields in priority order, and the URL keys tried inside {"imageUrl": ...} entries
+_IMAGE_FIELD_KEYS = ("mediumImageUrls", "smallImageUrls", "imageUrl", "itemImageUrl", "itemImageUrls")
+_IMAGE_FIELD_KEYS_REVERSED = tuple(reversed(_IMAGE_FIELD_KEYS))
+_IMAGE_ENTRY_KEYS = ("imageUrl", "itemImageUrl", "url")
+
+
 def pick_best_image_url(item: Dict[str, Any]) -> str:
-    def first_image_url(raw: Any) -> str:
-        if isinstance(raw, str):
-            return normalize_image_url(raw)
-        if isinstance(raw, dict):
-            for key in ("imageUrl", "itemImageUrl", "url"):
-                if raw.get(key):
-                    return normalize_image_url(str(raw.get(key, "")))
-            return ""
+    # Depth-first over the image fields in priority order; returns on the first usable URL
+    stack: List[Any] = [item.get(key) for key in _IMAGE_FIELD_KEYS_REVERSED]
+    while stack:
+        raw = stack.pop()
         if isinstance(raw, list):
-            for elem in raw:
-                selected = first_image_url(elem)
-                if selected:
-                    return selected
-        return ""
-
-    for key in (
-        "mediumImageUrls",
-        "smallImageUrls",
-        "imageUrl",
-        "itemImageUrl",
-        "itemImageUrls",
-    ):
-        selected_url = first_image_url(item.get(key))
-        if selected_url:
-            return selected_url
+            stack.extend(reversed(raw))
+            continue
+        if isinstance(raw, dict):
+            entry, raw = raw, ""
+            for key in _IMAGE_ENTRY_KEYS:
+                v = entry.get(key)
+                if v:
+                    raw = v if isinstance(v, str) else str(v)
+                    break
+        if isinstance(raw, str):
+            selected_url = normalize_image_url(raw)
+            if selected_url:
+                return selected_url
 
     return ""
 
 
 def shorten_item_name(name: str, limit: int = 40) -> str:
     text = (name or "").strip()
-    if len(text) <= limit:
-        return text
-    return text[:limit] + "…"
+    return text if len(text) <= limit else text[:limit] + "…"
 
 def safe_float(x: Any, default: float = 0.0) -> float:
+    t = type(x)
+    if t is float:
+        return x
+    if t is int:
+        return float(x)
     try:
         return float(x)
     except Exception:
         return default
 
 def safe_int(x: Any, default: int = 0) -> int:
+    t = type(x)
+    if t is int:
+        return x
+    if t is float:
+        try:
+            return int(x)
+        except Exception:
+            return default
+    # シート値は大半が素の整数文字列なので float を経由しない
+    if t is str and x.isdecimal():
+        return int(x)
     try:
         return int(float(x))
     except Exception:
         return default
 
 
+_DISCORD_CLAMP_SUFFIX = "\n...（自動短縮）"
+
 def clamp_discord_content(content: str, limit: int = 1800) -> str:
     if len(content) <= limit:
         return content
-    suffix = "\n...（自動短縮）"
-    return content[: max(0, limit - len(suffix))] + suffix
+    return content[: max(0, limit - len(_DISCORD_CLAMP_SUFFIX))] + _DISCORD_CLAMP_SUFFIX
 
-def discord_notify(title: str, lines: List[str]) -> None:
+def format_discord_content(title: str, lines: List[str]) -> str:
+    return clamp_discord_content(f"**{title}**\n" + "\n".join(lines), limit=1800)
+
+def discord_retry_after(resp: requests.Response) -> float:
+    # Discord returns {"retry_after": seconds} on 429; fall back to the Retry-After header
+    try:
+        wait = float(loads_json_bytes(resp.content).get("retry_after"))
+    except Exception:
+        wait = safe_float(resp.headers.get("Retry-After"), 1.0)
+    return max(0.0, min(wait, 30.0))
+
+def post_discord_content(content: str) -> None:
     if not DISCORD_WEBHOOK_URL:
         return
-    content = f"**{title}**\n" + "\n".join(lines)
-    content = clamp_discord_content(content, limit=1800)
     try:
-        resp = requests.post(DISCORD_WEBHOOK_URL, json={"content": content}, timeout=20)
+        resp = HTTP_SESSION.post(DISCORD_WEBHOOK_URL, json={"content": content}, timeout=20)
+        if resp.status_code == 429:
+            # The session never retries POSTs, so honor Discord's rate limit and retry once
+            wait = discord_retry_after(resp)
+            print(f"WARNING discord: rate limited, retrying in {wait:.1f}s")
+            time.sleep(wait)
+            resp = HTTP_SESSION.post(DISCORD_WEBHOOK_URL, json={"content": content}, timeout=20)
         resp.raise_for_status()
     except Exception:
+        title = content.split("\n", 1)[0]
         print(f"ERROR discord: failed to send notification title={title[:80]}")
         traceback.print_exc()
 
+def discord_notify(title: str, lines: List[str]) -> None:
+    post_discord_content(format_discord_content(title, lines))
+
+def pack_discord_contents(contents: List[str], limit: int = 1800) -> List[str]:
+    """Join consecutive messages (blank line between) while they still fit in one post."""
+    packed: List[str] = []
+    for content in contents:
+        if packed and len(packed[-1]) + 2 + len(content) <= limit:
+            packed[-1] = f"{packed[-1]}\n\n{content}"
+        else:
+            packed.append(content)
+    return packed
+
+def discord_notify_many(payloads: List[Tuple[str, List[str]]]) -> None:
+    """
+    Send independent notifications, packed into as few webhook posts as fit
+    the content limit; the posts go out one by one in payload order.
+    """
+    if not DISCORD_WEBHOOK_URL or not payloads:
+        return
+    messages = pack_discord_contents([format_discord_content(title, lines) for title, lines in payloads])
+    print(f"DEBUG discord: notifications={len(payloads)} posts={len(messages)}")
+    for content in messages:
+        post_discord_content(content)
 
-@dataclass
+
+@dataclass(slots=True)
 class HatenaPostResult:
     ok: bool
     status_code: Optional[int]
@@ -258,7 +412,7 @@ class HatenaPostResult:
     message: str
 
 
-@dataclass
+@dataclass(slots=True)
 class PriceChangeReport:
     level: str
     today_protein_cost: float
@@ -283,7 +437,7 @@ class PriceChangeReport:
     persona_section_chars: int
 
 
-@dataclass
+@dataclass(slots=True)
 class ChangeFlags:
     changed_shop: bool
     changed_min_cost: bool
@@ -307,17 +461,42 @@ def build_hatena_entry_endpoint() -> Optional[str]:
     return f"{service_endpoint}/entry"
 
 
+_ATOM_NS = "http://www.w3.org/2005/Atom"
+_APP_NS = "http://www.w3.org/2007/app"
+_HATENA_NS = "http://www.hatena.ne.jp/info/xmlns#"
+ET.register_namespace("", _ATOM_NS)
+ET.register_namespace("app", _APP_NS)
+ET.register_namespace("hatena", _HATENA_NS)
+
+
+def build_hatena_entry_xml(title: str, markdown_body: str) -> bytes:
+    # ElementTree escapes text in C and serializes straight to UTF-8 bytes
+    entry = ET.Element(f"{{{_ATOM_NS}}}entry")
+    ET.SubElement(entry, f"{{{_ATOM_NS}}}title").text = title
+    author = ET.SubElement(entry, f"{{{_ATOM_NS}}}author")
+    ET.SubElement(author, f"{{{_ATOM_NS}}}name").text = HATENA_ID
+    ET.SubElement(entry, f"{{{_HATENA_NS}}}syntax").text = "markdown"
+    ET.SubElement(entry, f"{{{_ATOM_NS}}}content", {"type": "text/plain"}).text = markdown_body
+    control = ET.SubElement(entry, f"{{{_APP_NS}}}control")
+    ET.SubElement(control, f"{{{_APP_NS}}}draft").text = "yes"
+    return ET.tostring(entry, encoding="utf-8", xml_declaration=True, short_empty_elements=False)
+
+
+_HATENA_COLLECTION_HREF_RE = re.compile(r'<collection[^>]*href="([^"]+)"')
+
+
 def log_hatena_service_document(auth: Tuple[str, str], service_endpoint: str) -> None:
     try:
-        resp = requests.get(service_endpoint, auth=auth, timeout=30)
+        resp = HTTP_SESSION.get(service_endpoint, auth=auth, timeout=30)
         print(f"DEBUG hatena: service_document status={resp.status_code} endpoint={service_endpoint}")
-        body_preview = (resp.text or "")[:500].replace("\n", " ").strip()
+        body = resp.text or ""
+        body_preview = body[:500].replace("\n", " ").strip()
         if body_preview:
             print(f"DEBUG hatena: service_document body_preview={body_preview}")
 
-        collection_hrefs = re.findall(r'<collection[^>]*href="([^"]+)"', resp.text or "")
+        collection_hrefs = _HATENA_COLLECTION_HREF_RE.findall(body)
         if collection_hrefs:
-            print("DEBUG hatena: service_document collections=" + ", ".join(collection_hrefs))
+            print(f"DEBUG hatena: service_document collections={', '.join(collection_hrefs)}")
         else:
             print("DEBUG hatena: service_document collections not found")
     except Exception:
@@ -359,23 +538,45 @@ def build_top3_markdown(best_offers: List[OfferRow]) -> str:
     return "\n".join(lines).strip()
 
 
-def read_price_history_daily_min(hist_ws, canonical_id: str) -> Dict[str, float]:
-    rows = hist_ws.get_all_records()
-    out: Dict[str, float] = {}
-    for r in rows:
-        cid = str(r.get("canonical_id", "")).strip()
-        if cid != canonical_id:
+def read_price_history_all_daily_min(
+    hist_values: List[List[str]], cids: Optional[FrozenSet[str]] = None
+) -> Dict[str, Dict[str, float]]:
+    """
+    {canonical_id: {date: min protein_cost}} for every id in one pass over the
+    Price_History snapshot, so reports don't re-read the sheet per canonical_id.
+    Each per-id dict is ordered by date (ascending).
+    When `cids` is given, rows for other canonical_ids are skipped.
+    """
+    out: Dict[str, Dict[str, float]] = {}
+    if not hist_values:
+        return out
+    idx = header_index(hist_values[0])
+    cid_col, date_col, cost_col = idx.get("canonical_id"), idx.get("date"), idx.get("protein_cost")
+    if cid_col is None or date_col is None or cost_col is None:
+        return out
+    for row in hist_values[1:]:
+        if len(row) <= cost_col:
             continue
-        day = str(r.get("date", "")).strip()
-        if not day:
+        cid = row[cid_col].strip()
+        if cids is not None and cid not in cids:
+            continue
+        day = row[date_col].strip()
+        if not cid or not day:
+            continue
+        try:
+            protein_cost = float(row[cost_col])
+        except ValueError:
             continue
-        protein_cost = safe_float(r.get("protein_cost", math.inf), math.inf)
         if protein_cost == math.inf:
             continue
-        prev = out.get(day)
+        daily = out.get(cid)
+        if daily is None:
+            out[cid] = {day: protein_cost}
+            continue
+        prev = daily.get(day)
         if prev is None or protein_cost < prev:
-            out[day] = protein_cost
-    return out
+            daily[day] = protein_cost
+    return {cid: dict(sorted(daily.items())) for cid, daily in out.items()}
 
 
 def choose_level(diff_yen: Optional[float], diff_pct: Optional[float], is_30d_low: bool) -> str:
@@ -390,45 +591,44 @@ def choose_level(diff_yen: Optional[float], diff_pct: Optional[float], is_30d_lo
     return "normal"
 
 
+_HASHTAG_STRIP = str.maketrans("", "", " \u3000")
+
+
 def build_marketing_report(
     master: MasterItem,
     best_offer: OfferRow,
-    hist_ws,
+    daily_min: Dict[str, float],
     today: str,
     yesterday: str,
     ranking_offers: Optional[List[OfferRow]] = None,
+    variant_info: Optional[Tuple[str, str, str, str, str, str]] = None,
 ) -> PriceChangeReport:
-    def build_persona_sections(offers: List[OfferRow], fallback_offer: OfferRow) -> List[str]:
-        personas = [
-            ("コスパ重視で最安を狙う人", "実質単価を最優先で比較したい"),
-            ("初めて買う人", "まずは定番の売れ筋から失敗を避けたい"),
-            ("毎日飲んで消費が早い人", "価格変動の前にまとめて確保したい"),
-            ("ポイント還元を活用したい人", "セールとポイント倍率を合わせて得したい"),
-            ("送料を抑えたい人", "本体価格だけでなく送料込みで判断したい"),
-            ("お気に入りのショップで買いたい人", "レビューや対応が安定した店舗を選びたい"),
-            ("最短で補充したい人", "在庫切れ前に今すぐ購入したい"),
-            ("品質を重視する人", "価格だけでなく人気商品を優先したい"),
-            ("価格下落タイミングを待っていた人", "今日の値下がりを確認して動きたい"),
-            ("迷っていて最後の一押しが欲しい人", "比較結果を見てすぐ決めたい"),
-        ]
-
-        lines: List[str] = ["## 人別おすすめセクション（10枠）", ""]
-        for idx, (heading, condition) in enumerate(personas, 1):
-            offer = offers[idx - 1] if idx - 1 < len(offers) else fallback_offer
+    def build_persona_sections(
+        offers: List[OfferRow], names: List[str], fallback_offer: OfferRow, out: List[str]
+    ) -> int:
+        """Append the persona block to `out`; returns its length as joined markdown."""
+        start = len(out)
+        out.extend(["## 人別おすすめセクション（10枠）", ""])
+        fallback_name = shorten_item_name(fallback_offer.item_name, 60)
+        for idx, (heading, condition) in enumerate(PERSONA_SLOTS, 1):
+            if idx - 1 < len(offers):
+                offer, name = offers[idx - 1], names[idx - 1]
+            else:
+                offer, name = fallback_offer, fallback_name
             reason = f"実質{offer.protein_cost:,.0f}円/kgで、{offer.shop_name or '実績あるショップ'}から買えるため。"
-            lines.extend(
+            out.extend(
                 [
                     f"### 枠{idx}: {heading}",
                     f"- 条件: {condition}",
-                    f"- おすすめ商品: **{shorten_item_name(offer.item_name, 60)}**",
+                    f"- おすすめ商品: **{name}**",
                     f"- 理由: {reason}",
                     f"- **👉 [大きめリンクで価格・在庫を確認する]({offer.item_url})**",
                     "",
                 ]
             )
-        return lines
+        # len("\n".join(block)) without building the joined string
+        return sum(len(line) for line in out[start:]) + len(out) - start - 1
 
-    daily_min = read_price_history_daily_min(hist_ws, master.canonical_id)
     today_protein_cost = best_offer.protein_cost
     today_raw_price = best_offer.raw_price
     yesterday_protein_cost = daily_min.get(yesterday)
@@ -440,23 +640,29 @@ def build_marketing_report(
         diff_pct = (diff_yen / yesterday_protein_cost) * 100.0
 
     start_date = (jst_date() - timedelta(days=29)).isoformat()
-    recent_prices = [p for d, p in daily_min.items() if start_date <= d <= today]
-    if recent_prices:
-        min_30d_protein_cost = min(recent_prices)
-        is_30d_low = today_protein_cost <= min_30d_protein_cost
-    else:
-        min_30d_protein_cost = None
-        is_30d_low = False
+    # daily_min is date-ordered: walk back from the newest day and stop at the window start
+    min_30d_protein_cost: Optional[float] = None
+    for d in reversed(daily_min):
+        if d < start_date:
+            break
+        if d <= today:
+            p = daily_min[d]
+            if min_30d_protein_cost is None or p < min_30d_protein_cost:
+                min_30d_protein_cost = p
+    is_30d_low = min_30d_protein_cost is not None and today_protein_cost <= min_30d_protein_cost
 
     level = choose_level(diff_yen, diff_pct, is_30d_low)
-    variant, variant_headline, variant_reason, variant_push_text, date_jst, weekday_jst = choose_variant_jst()
+    # The variant only depends on the JST day, so callers pass one choose_variant_jst() result per run
+    variant, variant_headline, variant_reason, variant_push_text, date_jst, weekday_jst = (
+        variant_info or choose_variant_jst()
+    )
     short_name = shorten_item_name(best_offer.item_name)
     capacity_label = f"{master.capacity_kg:g}kg" if master.capacity_kg > 0 else ""
     name_basis = master.search_keyword or master.brand
     product_label = " ".join([x for x in [master.brand, name_basis, capacity_label] if x]).strip()
     if not product_label:
         product_label = master.canonical_id
-    brand_hashtag = f"#{master.brand.replace(' ', '').replace('　', '')}" if master.brand else ""
+    brand_hashtag = f"#{master.brand.translate(_HASHTAG_STRIP)}" if master.brand else ""
 
     diff_label = (
         f"前日比 {diff_yen:+,}円 ({diff_pct:+.1f}%)"
@@ -486,28 +692,54 @@ def build_marketing_report(
         ]
     )
 
-    image_block_lines: List[str] = []
+    # Single line buffer for the whole post; every section appends to it in order
+    hatena_lines: List[str] = []
     if best_offer.image_url:
-        image_block_lines = [f"![商品画像]({best_offer.image_url})", ""]
-
-    ranking_sections: List[str] = []
-    persona_sections: List[str] = build_persona_sections(ranking_offers or [], best_offer)
+        hatena_lines.extend([f"![商品画像]({best_offer.image_url})", ""])
+    hatena_lines.extend(
+        [
+            f"🔥 判定：{variant_headline}（{variant_reason}）",
+            f"実質：{today_protein_cost:,.0f}円/kg｜価格：{today_raw_price:,}円｜前日比：{diff_inline}｜30日最安：{low30_flag}",
+            "👉 価格と在庫は下のボタンから確認",
+            "",
+            f"# {product_label} 価格速報（{today}）",
+            "",
+            f"**{variant_headline}**",
+            "",
+            f"- 今日最安（実質）: **{today_protein_cost:,.0f}円/kg**",
+            f"- 価格（本体）: **{today_raw_price:,}円**",
+            f"- 前日比: **{diff_inline}**",
+            f"- 30日最安: **{low30_flag}**（{f'{min_30d_protein_cost:,.0f}円/kg' if min_30d_protein_cost is not None else 'データ不足'}）",
+            "",
+            "## 今日の結論",
+            f"- 判定: **{variant_headline}**",
+            f"- 理由: {variant_reason}",
+            "",
+        ]
+    )
+    # Persona, hero and TOP20 blocks list the same leading offers; shorten each name once
+    persona_offers = (ranking_offers or [])[: len(PERSONA_SLOTS)]
+    short_names = [
+        shorten_item_name(o.item_name, 60)
+        for o in (ranking_offers or [])[: max(len(PERSONA_SLOTS), HERO_K, RANKING_N)]
+    ]
+    persona_section_chars = build_persona_sections(persona_offers, short_names, best_offer, hatena_lines)
     if ranking_offers is not None:
         hero_offers = ranking_offers[:HERO_K]
         top_offers = ranking_offers[:RANKING_N]
 
         if hero_offers:
             medals = ["🥇", "🥈", "🥉"]
-            ranking_sections.extend(["## 今日の推し（TOP3）", ""])
+            hatena_lines.extend(["## 今日の推し（TOP3）", ""])
             for i, offer in enumerate(hero_offers):
                 medal = medals[i] if i < len(medals) else "🏅"
                 point_pct = (offer.point_rate if offer.point_rate is not None else 0.0) * 100.0
-                ranking_sections.append(f"### {medal} {shorten_item_name(offer.item_name, 60)}")
+                hatena_lines.append(f"### {medal} {short_names[i]}")
                 if offer.item_url:
-                    ranking_sections.append(f"**👉 [楽天で価格と在庫を確認する]({offer.item_url})**")
+                    hatena_lines.append(f"**👉 [楽天で価格と在庫を確認する]({offer.item_url})**")
                 if offer.image_url:
-                    ranking_sections.append(f"![商品画像]({offer.image_url})")
-                ranking_sections.extend(
+                    hatena_lines.append(f"![商品画像]({offer.image_url})")
+                hatena_lines.extend(
                     [
                         f"- 実質単価: **{offer.protein_cost:,.0f}円/kg**",
                         f"- 価格: {offer.raw_price:,}円（送料 {offer.shipping_cost:,}円）",
@@ -516,39 +748,20 @@ def build_marketing_report(
                     ]
                 )
                 if offer.item_url:
-                    ranking_sections.append(f"**👉 [楽天で価格と在庫を確認する]({offer.item_url})**")
-                ranking_sections.append("")
+                    hatena_lines.append(f"**👉 [楽天で価格と在庫を確認する]({offer.item_url})**")
+                hatena_lines.append("")
 
         if top_offers:
-            ranking_sections.extend(["## 今日のランキング（TOP20）", ""])
+            hatena_lines.extend(["## 今日のランキング（TOP20）", ""])
             for rank, offer in enumerate(top_offers, 1):
-                ranking_sections.append(
-                    f"- {rank}. {shorten_item_name(offer.item_name, 60)}｜**{offer.protein_cost:,.0f}円/kg**｜{offer.shop_name or ''}"
+                hatena_lines.append(
+                    f"- {rank}. {short_names[rank - 1]}｜**{offer.protein_cost:,.0f}円/kg**｜{offer.shop_name or ''}"
                 )
                 if offer.item_url:
-                    ranking_sections.append(f"  - **👉 [商品を見に行く]({offer.item_url})**")
-            ranking_sections.append("")
-
-    hatena_markdown = "\n".join(
-        image_block_lines + [
-            f"🔥 判定：{variant_headline}（{variant_reason}）",
-            f"実質：{today_protein_cost:,.0f}円/kg｜価格：{today_raw_price:,}円｜前日比：{diff_inline}｜30日最安：{low30_flag}",
-            "👉 価格と在庫は下のボタンから確認",
-            "",
-            f"# {product_label} 価格速報（{today}）",
-            "",
-            f"**{variant_headline}**",
-            "",
-            f"- 今日最安（実質）: **{today_protein_cost:,.0f}円/kg**",
-            f"- 価格（本体）: **{today_raw_price:,}円**",
-            f"- 前日比: **{diff_inline}**",
-            f"- 30日最安: **{low30_flag}**（{f'{min_30d_protein_cost:,.0f}円/kg' if min_30d_protein_cost is not None else 'データ不足'}）",
-            "",
-            "## 今日の結論",
-            f"- 判定: **{variant_headline}**",
-            f"- 理由: {variant_reason}",
-            "",
-        ] + persona_sections + ranking_sections + [
+                    hatena_lines.append(f"  - **👉 [商品を見に行く]({offer.item_url})**")
+            hatena_lines.append("")
+    hatena_lines.extend(
+        [
             "## 価格データ",
             f"- 商品名: {short_name}",
             f"- ショップ: {best_offer.shop_name}",
@@ -568,6 +781,7 @@ def build_marketing_report(
             "※ 価格・ポイント・在庫は変動します。購入前に楽天の商品ページで最新情報をご確認ください。",
         ]
     )
+    hatena_markdown = "\n".join(hatena_lines)
 
     return PriceChangeReport(
         level=level,
@@ -589,8 +803,8 @@ def build_marketing_report(
         short_item_name=short_name,
         x_text=x_text,
         hatena_markdown=hatena_markdown,
-        persona_slot_count=10,
-        persona_section_chars=len("\n".join(persona_sections)),
+        persona_slot_count=len(PERSONA_SLOTS),
+        persona_section_chars=persona_section_chars,
     )
 
 
@@ -608,23 +822,13 @@ def post_top3_to_hatena(markdown_body: str) -> HatenaPostResult:
         return HatenaPostResult(ok=False, status_code=None, endpoint="", message=msg)
 
     title = f"【プロテイン価格ランキング】{jst_today_str()}"
-    atom_xml = f"""<?xml version=\"1.0\" encoding=\"utf-8\"?>
-<entry xmlns=\"http://www.w3.org/2005/Atom\" xmlns:app=\"http://www.w3.org/2007/app\" xmlns:hatena=\"http://www.hatena.ne.jp/info/xmlns#\">
-  <title>{escape(title)}</title>
-  <author><name>{escape(HATENA_ID)}</name></author>
-  <hatena:syntax>markdown</hatena:syntax>
-  <content type=\"text/plain\">{escape(markdown_body)}</content>
-  <app:control>
-    <app:draft>yes</app:draft>
-  </app:control>
-</entry>
-"""
+    atom_xml = build_hatena_entry_xml(title, markdown_body)
 
     try:
         print(f"INFO hatena: posting draft endpoint={entry_endpoint}")
-        resp = requests.post(
+        resp = HTTP_SESSION.post(
             entry_endpoint,
-            data=atom_xml.encode("utf-8"),
+            data=atom_xml,
             auth=(HATENA_ID, HATENA_API_KEY),
             headers={"Content-Type": "application/xml; charset=utf-8"},
             timeout=30,
@@ -652,19 +856,22 @@ def post_top3_to_hatena(markdown_body: str) -> HatenaPostResult:
 def load_service_account_dict_b64() -> dict:
     if not (SHEET_ID and GSPREAD_SERVICE_ACCOUNT_JSON_B64):
         raise RuntimeError("Missing SHEET_ID or GSPREAD_SERVICE_ACCOUNT_JSON_B64")
-    raw = base64.b64decode(GSPREAD_SERVICE_ACCOUNT_JSON_B64.encode("utf-8")).decode("utf-8")
-    return json.loads(raw)
+    # json.loads accepts the decoded bytes directly
+    return json.loads(base64.b64decode(GSPREAD_SERVICE_ACCOUNT_JSON_B64))
 
 def open_sheets():
     masked_sheet_id = f"{SHEET_ID[:4]}...{SHEET_ID[-4:]}" if len(SHEET_ID) >= 8 else "(masked)"
     print(f"DEBUG sheet: opening sheet... sheet_id={masked_sheet_id}")
     creds_dict = load_service_account_dict_b64()
-    gc = gspread.service_account_from_dict(creds_dict)
+    # BackOffHTTPClient retries 408/429 quota errors with exponential backoff instead of failing the run
+    gc = gspread.service_account_from_dict(creds_dict, http_client=gspread.http_client.BackOffHTTPClient)
     print("DEBUG sheet: gspread authentication success")
     sh = gc.open_by_key(SHEET_ID)
 
     master_ws = sh.worksheet("Master_List")
     print(f"DEBUG sheet: worksheet name={master_ws.title}")
+    # Read once; shared by Query_List seeding and read_master()
+    master_values = master_ws.get_all_values()
     hist_ws = sh.worksheet("Price_History")
     print(f"DEBUG sheet: worksheet name={hist_ws.title}")
 
@@ -711,14 +918,14 @@ def open_sheets():
         query_ws_created = True
         print("INFO sheet: worksheet name=Query_List created with default headers")
 
-    seeded = seed_query_list_from_master(master_ws, query_ws)
+    seeded = seed_query_list_from_master(master_values, query_ws)
     print(
         "INFO query_list:",
         f"seeded_from_master={seeded}",
         f"created_now={query_ws_created}",
     )
 
-    return master_ws, hist_ws, min_ws, catalog_ws, query_ws
+    return master_values, hist_ws, min_ws, catalog_ws, query_ws
 
 
 def _normalize_text(value: str) -> str:
@@ -779,25 +986,29 @@ def _is_track_enabled(value: Any) -> bool:
     return text in {"1", "true", "t", "yes", "y", "on"}
 
 
-def seed_query_list_from_master(master_ws, query_ws) -> int:
-    query_rows = query_ws.get_all_records()
-    existing_keywords = {
-        str(r.get("search_keyword") or r.get("query") or r.get("keyword") or "").strip().lower()
-        for r in query_rows
-        if str(r.get("search_keyword") or r.get("query") or r.get("keyword") or "").strip()
-    }
+def seed_query_list_from_master(master_values: List[List[str]], query_ws) -> int:
+    query_values = query_ws.get_all_values()
+    existing_keywords: set = set()
+    if query_values:
+        q_idx = header_index(query_values[0])
+        kw_cols = [q_idx.get("search_keyword"), q_idx.get("query"), q_idx.get("keyword")]
+        for row in query_values[1:]:
+            kw = next((v for v in (cell(row, c) for c in kw_cols) if v), "")
+            if kw:
+                existing_keywords.add(kw.lower())
 
-    master_rows = master_ws.get_all_records()
+    m_kw_col = header_index(master_values[0]).get("search_keyword") if master_values else None
     new_rows: List[List[Any]] = []
-    for r in master_rows:
-        keyword = str(r.get("search_keyword", "")).strip()
+    created_at = jst_now_iso()
+    for row in master_values[1:]:
+        keyword = cell(row, m_kw_col)
         if not keyword:
             continue
         keyword_key = keyword.lower()
         if keyword_key in existing_keywords:
             continue
         existing_keywords.add(keyword_key)
-        new_rows.append([keyword, 1, jst_now_iso(), "seed_from_master_list"])
+        new_rows.append([keyword, 1, created_at, "seed_from_master_list"])
 
     if new_rows:
         query_ws.append_rows(new_rows, value_input_option="RAW")
@@ -861,24 +1072,24 @@ def build_canonical_id(brand_code: str, protein_type: str, capacity_kg: float) -
 def read_query_keywords(query_ws) -> Tuple[List[str], Dict[str, int]]:
     if query_ws is None:
         return [], {"total_rows": 0, "enabled_rows": 0, "disabled_rows": 0, "empty_keyword_rows": 0}
-    rows = query_ws.get_all_records()
+    values = query_ws.get_all_values()
     keywords: List[str] = []
     stats = {"total_rows": 0, "enabled_rows": 0, "disabled_rows": 0, "empty_keyword_rows": 0}
-    for r in rows:
+    if not values:
+        return keywords, stats
+    idx = header_index(values[0])
+    kw_cols = [idx.get("search_keyword"), idx.get("query"), idx.get("keyword"), idx.get("検索ワード")]
+    enabled_col = idx.get("enabled")
+    for row in values[1:]:
         stats["total_rows"] += 1
-        kw = str(
-            r.get("search_keyword")
-            or r.get("query")
-            or r.get("keyword")
-            or r.get("検索ワード")
-            or ""
-        ).strip()
+        kw = next((v for v in (cell(row, c) for c in kw_cols) if v), "")
         if not kw:
             stats["empty_keyword_rows"] += 1
             continue
 
-        enabled_raw = r.get("enabled", 1)
-        enabled = True if str(enabled_raw or "").strip() == "" else _is_track_enabled(enabled_raw)
+        # Missing column or empty cell -> enabled
+        enabled_raw = cell(row, enabled_col)
+        enabled = enabled_raw == "" or _is_track_enabled(enabled_raw)
         if enabled:
             keywords.append(kw)
             stats["enabled_rows"] += 1
@@ -889,12 +1100,11 @@ def read_query_keywords(query_ws) -> Tuple[List[str], Dict[str, int]]:
 
 
 def read_catalog_ids(catalog_ws) -> set:
-    rows = catalog_ws.get_all_records()
-    return {
-        str(r.get("canonical_id", "")).strip()
-        for r in rows
-        if str(r.get("canonical_id", "")).strip()
-    }
+    values = catalog_ws.get_all_values()
+    if not values:
+        return set()
+    cid_col = header_index(values[0]).get("canonical_id")
+    return {cid for cid in (cell(row, cid_col) for row in values[1:]) if cid}
 
 
 def update_catalog_from_query_list(catalog_ws, query_ws) -> Tuple[int, Dict[str, Any]]:
@@ -910,9 +1120,10 @@ def update_catalog_from_query_list(catalog_ws, query_ws) -> Tuple[int, Dict[str,
     existing_ids = read_catalog_ids(catalog_ws)
     new_rows: List[List[Any]] = []
     run_seen: set = set()
+    created_at = jst_now_iso()
 
+    # Every page request is paced by RAKUTEN_LIMITER, so keywords need no extra sleep
     for keyword in query_keywords:
-        time.sleep(REQUEST_SLEEP_SEC)
         items, api_total_count = rakuten_search_multi_pages(keyword, total_hits=FETCH_HITS)
         print(
             "DEBUG catalog_fetch:",
@@ -949,7 +1160,7 @@ def update_catalog_from_query_list(catalog_ws, query_ws) -> Tuple[int, Dict[str,
                 round(capacity_kg, 3),
                 keyword,
                 0,
-                jst_now_iso(),
+                created_at,
             ])
 
     if new_rows:
@@ -964,40 +1175,49 @@ def update_catalog_from_query_list(catalog_ws, query_ws) -> Tuple[int, Dict[str,
 
     return len(new_rows), {"query_stats": query_stats, "fetch_zero_keywords": fetch_zero_keywords}
 
-def read_master(master_ws) -> List[MasterItem]:
-    rows = master_ws.get_all_records()
+def read_master(values: List[List[str]]) -> List[MasterItem]:
+    """Master_List rows from the snapshot taken in open_sheets()."""
+    if not values:
+        return []
+    idx = header_index(values[0])
+    cid_col, kw_col, brand_col = idx.get("canonical_id"), idx.get("search_keyword"), idx.get("brand")
+    kg_col, ratio_col = idx.get("capacity_kg"), idx.get("protein_ratio")
+
     items: List[MasterItem] = []
-    for r in rows:
-        cid = str(r.get("canonical_id", "")).strip()
-        kw = str(r.get("search_keyword", "")).strip()
+    for row in values[1:]:
+        cid = cell(row, cid_col)
+        kw = cell(row, kw_col)
         if not cid or not kw:
             continue
         items.append(
             MasterItem(
                 canonical_id=cid,
                 search_keyword=kw,
-                brand=str(r.get("brand", "")).strip(),
-                capacity_kg=safe_float(r.get("capacity_kg", 0)),
-                protein_ratio=safe_float(r.get("protein_ratio", 0)),
+                brand=cell(row, brand_col),
+                capacity_kg=safe_float(cell(row, kg_col, "0")),
+                protein_ratio=safe_float(cell(row, ratio_col, "0")),
             )
         )
     return items
 
 
 def read_tracked_catalog(catalog_ws, master_by_id: Dict[str, MasterItem]) -> List[MasterItem]:
-    rows = catalog_ws.get_all_records()
-    header = [str(v).strip() for v in (catalog_ws.row_values(1) or [])]
-    has_track_column = "track" in header
+    values = catalog_ws.get_all_values()
+    if not values:
+        return []
+    idx = header_index(values[0])
+    cid_col, track_col, kw_col = idx.get("canonical_id"), idx.get("track"), idx.get("search_keyword")
+    brand_col, kg_col = idx.get("brand"), idx.get("capacity_kg")
 
     items: List[MasterItem] = []
-    for r in rows:
-        cid = str(r.get("canonical_id", "")).strip()
+    for row in values[1:]:
+        cid = cell(row, cid_col)
         if not cid:
             continue
-        if has_track_column and not _is_track_enabled(r.get("track", "")):
+        if track_col is not None and not _is_track_enabled(cell(row, track_col)):
             continue
 
-        kw = str(r.get("search_keyword", "")).strip()
+        kw = cell(row, kw_col)
         master = master_by_id.get(cid)
         if not master:
             print(f"WARNING catalog: canonical_id={cid} has track=1 but no Master_List record. skipped")
@@ -1008,20 +1228,23 @@ def read_tracked_catalog(catalog_ws, master_by_id: Dict[str, MasterItem]) -> Lis
             MasterItem(
                 canonical_id=cid,
                 search_keyword=search_keyword,
-                brand=str(r.get("brand", "")).strip() or master.brand,
-                capacity_kg=safe_float(r.get("capacity_kg", master.capacity_kg), master.capacity_kg),
+                brand=cell(row, brand_col) or master.brand,
+                capacity_kg=safe_float(cell(row, kg_col), master.capacity_kg),
                 protein_ratio=master.protein_ratio,
             )
         )
     return items
 
 
-def read_yesterday_tracked_count_from_history(hist_ws, target_date: str) -> int:
-    rows = hist_ws.get_all_records()
+def read_yesterday_tracked_count_from_history(hist_values: List[List[str]], target_date: str) -> int:
+    if not hist_values:
+        return 0
+    idx = header_index(hist_values[0])
+    date_col, cid_col = idx.get("date"), idx.get("canonical_id")
     tracked_ids = {
-        str(r.get("canonical_id", "")).strip()
-        for r in rows
-        if str(r.get("date", "")).strip() == target_date and str(r.get("canonical_id", "")).strip()
+        cell(row, cid_col)
+        for row in hist_values[1:]
+        if cell(row, date_col) == target_date and cell(row, cid_col)
     }
     return len(tracked_ids)
 
@@ -1042,8 +1265,9 @@ def evaluate_track_drop(today_count: int, yesterday_count: int) -> Tuple[bool, s
         f"(threshold: min_delta={TRACK_DROP_ALERT_MIN_DELTA}, min_ratio={TRACK_DROP_ALERT_RATIO*100:.1f}%)"
     )
 
-def ensure_history_headers(hist_ws) -> None:
-    existing = hist_ws.get_all_values()
+def ensure_history_headers(hist_ws, hist_values: Optional[List[List[str]]] = None) -> None:
+    # Reuse the run's Price_History snapshot when given; otherwise only row 1 is read
+    existing = hist_values if hist_values is not None else hist_ws.row_values(1)
     if existing:
         return
     hist_ws.append_row(
@@ -1062,64 +1286,83 @@ def ensure_history_headers(hist_ws) -> None:
         value_input_option="RAW",
     )
 
-def append_history(hist_ws, offer_rows: List[OfferRow]) -> None:
+def append_history(hist_ws, offer_rows: List[OfferRow], hist_values: Optional[List[List[str]]] = None) -> None:
     if not offer_rows:
         return
-    ensure_history_headers(hist_ws)
-    values = [
-        [
-            o.date,
-            o.canonical_id,
-            o.item_code,
-            o.shop_name,
-            o.raw_price,
-            o.shipping_cost,
-            round(o.point_rate, 6),
-            round(o.protein_cost, 6),
-            o.item_url,
-            o.item_name,
+    ensure_history_headers(hist_ws, hist_values)
+    print(f"DEBUG sheet: appending {len(offer_rows)} rows")
+    # Stay well under the per-request cell limit when many masters are tracked;
+    # rows are built per chunk so only one chunk of cell values is alive at a time
+    for start in range(0, len(offer_rows), HISTORY_APPEND_CHUNK_ROWS):
+        chunk = [
+            [
+                o.date,
+                o.canonical_id,
+                o.item_code,
+                o.shop_name,
+                o.raw_price,
+                o.shipping_cost,
+                round(o.point_rate, 6),
+                round(o.protein_cost, 6),
+                o.item_url,
+                o.item_name,
+            ]
+            for o in offer_rows[start:start + HISTORY_APPEND_CHUNK_ROWS]
         ]
-        for o in offer_rows
-    ]
-    print(f"DEBUG sheet: appending {len(values)} rows")
-    try:
-        hist_ws.append_rows(values, value_input_option="RAW")
-    except Exception:
-        print("ERROR sheet: append_rows failed")
-        traceback.print_exc()
-        raise
+        try:
+            hist_ws.append_rows(chunk, value_input_option="RAW", insert_data_option="INSERT_ROWS")
+        except Exception:
+            print(f"ERROR sheet: append_rows failed rows={start + 1}-{start + len(chunk)}")
+            traceback.print_exc()
+            raise
     print("DEBUG sheet: append success")
 
-def read_min_summary(min_ws, target_date: str) -> Dict[str, Tuple[float, str, str]]:
-    rows = min_ws.get_all_records()
-    out: Dict[str, Tuple[float, str, str]] = {}
-    for r in rows:
-        if str(r.get("date", "")).strip() != target_date:
-            continue
-        cid = str(r.get("canonical_id", "")).strip()
-        if not cid:
-            continue
-        out[cid] = (
-            safe_float(r.get("min_cost", math.inf), math.inf),
-            str(r.get("min_shop", "")).strip(),
-            str(r.get("min_url", "")).strip(),
-        )
-    return out
+def header_index(header: List[Any]) -> Dict[str, int]:
+    """Map column name -> position (first occurrence wins) for get_all_values() rows."""
+    idx: Dict[str, int] = {}
+    for i, h in enumerate(header):
+        idx.setdefault(str(h).strip(), i)
+    return idx
 
-def read_alltime_min(min_ws) -> Dict[str, Tuple[float, str, str]]:
-    rows = min_ws.get_all_records()
-    out: Dict[str, Tuple[float, str, str]] = {}
-    for r in rows:
-        cid = str(r.get("canonical_id", "")).strip()
-        if not cid:
+def cell(row: List[Any], col: Optional[int], default: str = "") -> str:
+    if col is None or col >= len(row):
+        return default
+    return str(row[col]).strip()
+
+def load_min_summary(min_ws) -> List[List[str]]:
+    """Read Min_Summary once per run (raw values, header = row 1)."""
+    return min_ws.get_all_values()
+
+def read_min_summaries(
+    min_values: List[List[str]], target_date: str, cids: Optional[FrozenSet[str]] = None
+) -> Tuple[Dict[str, Tuple[float, str, str]], Dict[str, Tuple[float, str, str]]]:
+    """
+    One pass over Min_Summary rows.
+    Returns ({cid: (cost, shop, url)} for target_date, {cid: all-time min (cost, shop, url)}).
+    When `cids` is given, rows for other canonical_ids are skipped.
+    """
+    day_min: Dict[str, Tuple[float, str, str]] = {}
+    alltime_min: Dict[str, Tuple[float, str, str]] = {}
+    if not min_values:
+        return day_min, alltime_min
+    idx = header_index(min_values[0])
+    date_col, cid_col = idx.get("date"), idx.get("canonical_id")
+    cost_col, shop_col, url_col = idx.get("min_cost"), idx.get("min_shop"), idx.get("min_url")
+    for row in min_values[1:]:
+        cid = cell(row, cid_col)
+        if not cid or (cids is not None and cid not in cids):
             continue
-        cost = safe_float(r.get("min_cost", math.inf), math.inf)
-        shop = str(r.get("min_shop", "")).strip()
-        url = str(r.get("min_url", "")).strip()
-        prev = out.get(cid)
-        if prev is None or cost < prev[0]:
-            out[cid] = (cost, shop, url)
-    return out
+        entry = (
+            safe_float(cell(row, cost_col, "inf"), math.inf),
+            cell(row, shop_col),
+            cell(row, url_col),
+        )
+        if cell(row, date_col) == target_date:
+            day_min[cid] = entry
+        prev = alltime_min.get(cid)
+        if prev is None or entry[0] < prev[0]:
+            alltime_min[cid] = entry
+    return day_min, alltime_min
 
 
 def detect_changes(
@@ -1136,55 +1379,79 @@ def detect_changes(
         new_alltime_low=new_alltime_low,
     )
 
-def upsert_today_min(min_ws, date: str, cid: str, min_cost: float, min_shop: str, min_url: str) -> None:
+def build_min_summary_row_index(min_values: List[List[str]]) -> Dict[Tuple[str, str], int]:
+    """(date, canonical_id) -> 1-based sheet row, built once from the Min_Summary snapshot."""
+    row_by_key: Dict[Tuple[str, str], int] = {}
+    # header row = 1
+    for row_idx, row in enumerate(min_values[1:], start=2):
+        if len(row) >= 2:
+            row_by_key.setdefault((row[0], row[1]), row_idx)
+    return row_by_key
+
+def upsert_today_mins(
+    min_ws,
+    entries: List[Tuple[str, str, float, str, str]],
+    row_by_key: Dict[Tuple[str, str], int],
+) -> None:
     """
-    Upsert by (date, canonical_id).
-    Uses a simple scan; Min_Summary is small (20 items/day), so stays fast.
+    Upsert (date, canonical_id, min_cost, min_shop, min_url) rows by (date, canonical_id).
+    `row_by_key` comes from build_min_summary_row_index() on the run's Min_Summary snapshot,
+    so the whole run is flushed with one batch_update and one append_rows and no extra read.
     """
-    values = min_ws.get_all_values()
-    target_row = None
+    if not entries:
+        return
 
-    # header row = 1
-    for row_idx in range(2, len(values) + 1):
-        row = values[row_idx - 1]
-        if len(row) >= 2 and row[0] == date and row[1] == cid:
-            target_row = row_idx
-            break
+    # Same (date, cid) twice in one run: the last one wins
+    latest: Dict[Tuple[str, str], Tuple[float, str, str]] = {}
+    for date, cid, min_cost, min_shop, min_url in entries:
+        latest[(date, cid)] = (min_cost, min_shop, min_url)
 
     updated_at = jst_now_iso()
-    if target_row:
-        # gspread warning対策: updateはキーワード引数(values/range_name)で統一する
-        min_ws.update(
-            values=[[str(min_cost), min_shop, min_url, updated_at]],
-            range_name=f"C{target_row}:F{target_row}",
-        )
-    else:
-        min_ws.append_row([date, cid, str(min_cost), min_shop, min_url, updated_at], value_input_option="RAW")
+    updates: List[Dict[str, Any]] = []
+    appends: List[List[Any]] = []
+    for (date, cid), (min_cost, min_shop, min_url) in latest.items():
+        target_row = row_by_key.get((date, cid))
+        if target_row:
+            updates.append(
+                {
+                    "range": f"C{target_row}:F{target_row}",
+                    "values": [[str(min_cost), min_shop, min_url, updated_at]],
+                }
+            )
+        else:
+            appends.append([date, cid, str(min_cost), min_shop, min_url, updated_at])
+
+    print(f"DEBUG sheet: Min_Summary upsert updates={len(updates)} appends={len(appends)}")
+    if updates:
+        min_ws.batch_update(updates)
+    if appends:
+        min_ws.append_rows(appends, value_input_option="RAW")
 
 
 # =========================
 # Rakuten API
 # =========================
+# Run-invariant query params; only keyword/hits/page change per request
+_RAKUTEN_BASE_PARAMS: Dict[str, Any] = {
+    "applicationId": RAKUTEN_APP_ID,
+    "sort": "+itemPrice",
+    "format": "json",
+    "formatVersion": 2,
+    **({"affiliateId": RAKUTEN_AFFILIATE_ID} if RAKUTEN_AFFILIATE_ID else {}),
+}
+
+
 def rakuten_search_page(keyword: str, page: int, hits: int) -> Tuple[List[Dict[str, Any]], int]:
     if not RAKUTEN_APP_ID:
         raise RuntimeError("Missing RAKUTEN_APP_ID")
 
-    params = {
-        "applicationId": RAKUTEN_APP_ID,
-        "keyword": keyword,
-        "hits": max(1, min(30, hits)),
-        "page": page,
-        "sort": "+itemPrice",
-        "format": "json",
-        "formatVersion": 2,
-    }
-    if RAKUTEN_AFFILIATE_ID:
-        params["affiliateId"] = RAKUTEN_AFFILIATE_ID
+    params = {**_RAKUTEN_BASE_PARAMS, "keyword": keyword, "hits": max(1, min(30, hits)), "page": page}
 
-    resp = requests.get(RAKUTEN_ENDPOINT, params=params, timeout=30)
+    RAKUTEN_LIMITER.acquire()
+    resp = HTTP_SESSION.get(RAKUTEN_ENDPOINT, params=params, timeout=30)
     resp.raise_for_status()
 
-    data = resp.json()
+    data = loads_json_bytes(resp.content)
 
     print("DEBUG http:", resp.status_code, "keys:", list(data.keys())[:10])
 
@@ -1197,8 +1464,6 @@ def rakuten_search_page(keyword: str, page: int, hits: int) -> Tuple[List[Dict[s
     # old style variants
     if isinstance(data, dict) and data.get("Items"):
         items = data["Items"]
-        if not items:
-            return []
         first = items[0]
         # {"Items":[{"Item":{...}}, ...]}
         if isinstance(first, dict) and "Item" in first:
@@ -1214,84 +1479,109 @@ def rakuten_search_page(keyword: str, page: int, hits: int) -> Tuple[List[Dict[s
     return [], total_count
     
 def rakuten_search_multi_pages(keyword: str, total_hits: int) -> Tuple[List[Dict[str, Any]], int]:
-    all_items: List[Dict[str, Any]] = []
-    remaining = total_hits
-    page = 1
-    api_total_count = 0
-
-    while remaining > 0:
-        hits = min(30, remaining)
-        items, total_count = rakuten_search_page(keyword, page=page, hits=hits)
-        if page == 1:
-            api_total_count = total_count
-        if not items:
-            break
-
+    """
+    Fetch up to `total_hits` items for `keyword` (max 10 pages).
+    Page 1 tells how many results exist; the remaining pages are fetched one by one.
+    Parallelism stays at the master level (iter_master_items) and every page
+    request is paced by RAKUTEN_LIMITER.
+    """
+    if total_hits <= 0:
+        return [], 0
+
+    # Same page size on every page so page offsets line up
+    per_page = min(30, total_hits)
+    first_items, api_total_count = rakuten_search_page(keyword, page=1, hits=per_page)
+    if not first_items or len(first_items) < per_page:
+        return first_items, api_total_count
+
+    wanted = min(total_hits, api_total_count) if api_total_count > 0 else total_hits
+    last_page = min(10, math.ceil(wanted / per_page))
+    if last_page <= 1:
+        return first_items, api_total_count
+
+    all_items: List[Dict[str, Any]] = list(first_items)
+    for page in range(2, last_page + 1):
+        items, _ = rakuten_search_page(keyword, page=page, hits=per_page)
         all_items.extend(items)
-        remaining -= len(items)
-
-        if len(items) < hits:
+        if len(items) < per_page:
             break
+    return all_items[:total_hits], api_total_count
 
-        page += 1
-        if page > 10:
-            break
 
-        time.sleep(0.3)
+def fetch_master_items(master: MasterItem) -> Tuple[List[Dict[str, Any]], int]:
+    # Pacing is done per request by RAKUTEN_LIMITER
+    return rakuten_search_multi_pages(master.search_keyword, total_hits=FETCH_HITS)
+
 
-    return all_items, api_total_count
+def iter_master_items(masters: List[MasterItem]) -> Iterator[Tuple[MasterItem, Tuple[List[Dict[str, Any]], int]]]:
+    """
+    Fetch Rakuten items for every master concurrently.
+    Results are yielded in `masters` order as soon as each one is ready, so the
+    caller can filter earlier masters while later ones are still being fetched.
+    If a fetch or the caller raises (or the generator is closed early), masters
+    not started yet are cancelled so a failed run stops calling Rakuten.
+    """
+    if not masters:
+        return
+    ex = ThreadPoolExecutor(max_workers=max(1, RAKUTEN_CONCURRENCY))
+    try:
+        yield from zip(masters, ex.map(fetch_master_items, masters))
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
 
 # =========================
 # Filtering / Compute
 # =========================
 def looks_like_garbage(item_name: str) -> bool:
-    name = item_name or ""
-    return any(k in name for k in EXCLUDE_KEYWORDS)
+    if EXCLUDE_RE is None:
+        return False
+    return EXCLUDE_RE.search(item_name or "") is not None
     
+# 全角数字→半角 / 全角 k・g→半角（最低限）を1回のtranslateで
+_NORM_NAME_TABLE = str.maketrans("０１２３４５６７８９ｋｇＫＧ", "0123456789kgkg")
+_ANY_DIGIT_RE = re.compile(r"[0-9０-９]")
+
 def _norm_name(s: str) -> str:
-    s = (s or "").lower()
-    # 全角数字→半角
-    s = s.translate(str.maketrans("０１２３４５６７８９", "0123456789"))
-    # 全角英字っぽいのを半角へ寄せる（最低限）
-    s = s.replace("ｋ", "k").replace("ｇ", "g").replace("Ｋ", "k").replace("Ｇ", "g")
-    # スペース類を消す
-    s = re.sub(r"\s+", "", s)
-    return s
+    s = (s or "").lower().translate(_NORM_NAME_TABLE)
+    # スペース類を消す（str.split() は \s と同じ Unicode 空白で区切る）
+    return "".join(s.split())
+
+@lru_cache(maxsize=64)
+def _capacity_name_token(kg: float) -> str:
+    # 3.0 -> "3kg", 0.5 -> "500g"; one per distinct master capacity
+    if kg >= 1.0:
+        return f"{int(round(kg))}kg"
+    return f"{int(round(kg * 1000))}g"
 
 def capacity_strict_match(master: MasterItem, item_name: str) -> bool:
     if not STRICT_CAPACITY_MATCH:
         return False
     if master.capacity_kg <= 0:
         return True
+    # No digit at all -> no capacity token; skip normalization
+    if not item_name or _ANY_DIGIT_RE.search(item_name) is None:
+        return False
 
-    name = _norm_name(item_name)
-    kg = master.capacity_kg
-
-    if kg >= 1.0:
-        n = int(round(kg))
-        # 例: 3kg / 3kg×1 / 3kgx1 / 3kg(〜) / 3kg入り などを許容
-        return re.search(rf"{n}kg($|[×x\(\)0-9]|入り|ﾊﾟｯｸ|袋|個)", name) is not None or f"{n}kg" in name
-
-    grams = int(round(kg * 1000))
-    return re.search(rf"{grams}g($|[×x\(\)0-9]|入り|ﾊﾟｯｸ|袋|個)", name) is not None or f"{grams}g" in name
+    # 例: 3kg / 3kg×1 / 3kgx1 / 3kg(〜) / 3kg入り はすべて token を含むので部分一致で判定
+    return _capacity_name_token(master.capacity_kg) in _norm_name(item_name)
     
-def compute_offer(master: MasterItem, item: Dict[str, Any]) -> Optional[OfferRow]:
-    date = jst_today_str()
-    item_code = str(item.get("itemCode", "")).strip()
-    shop_name = str(item.get("shopName", "")).strip()
-    item_url = str(item.get("itemUrl", "")).strip()
-    item_name = str(item.get("itemName", "")).strip()
-    image_url = pick_best_image_url(item)
-
-    raw_price = safe_int(item.get("itemPrice", 0), 0)
-    if not item_code or not shop_name or raw_price <= 0:
-        return None
+def parse_raw_item(item: Dict[str, Any]) -> RawItem:
+    return RawItem(
+        item_code=str(item.get("itemCode", "")).strip(),
+        shop_name=str(item.get("shopName", "")).strip(),
+        item_name=str(item.get("itemName", "")).strip(),
+        raw_price=safe_int(item.get("itemPrice", 0), 0),
+        item=item,
+    )
 
-    # Garbage filtering
-    if looks_like_garbage(item_name):
-        return None
-    if not capacity_strict_match(master, item_name):
-        return None
+
+def compute_offer(master: MasterItem, raw: RawItem) -> Optional[ScoredItem]:
+    """
+    Effective-cost arithmetic only. The item must already have passed
+    classify_item_filter (required fields, exclude keywords, capacity).
+    """
+    item = raw.item
+    raw_price = raw.raw_price
 
     # postageFlag: 0=shipping included, 1=shipping NOT included (add DEFAULT_SHIPPING_YEN) 
     postage_flag = safe_int(item.get("postageFlag", 0), 0)
@@ -1302,49 +1592,57 @@ def compute_offer(master: MasterItem, item: Dict[str, Any]) -> Optional[OfferRow
     point_rate = max(0.0, min(1.0, point_rate_percent / 100.0))
     point_rate = max(0.0, min(1.0, point_rate + EXTRA_POINT_RATE))
 
-    denom = master.capacity_kg * master.protein_ratio
+    denom = master.protein_kg
     if denom <= 0:
         return None
 
     protein_cost = ((raw_price + shipping) * (1.0 - point_rate)) / denom
+    return ScoredItem(raw=raw, shipping_cost=shipping, point_rate=point_rate, protein_cost=protein_cost)
 
+
+def build_offer_row(master: MasterItem, scored: ScoredItem, date: str) -> OfferRow:
+    # URL fields (incl. the image pick) are only resolved for offers that survive the top-K cut
+    raw = scored.raw
     return OfferRow(
         date=date,
         canonical_id=master.canonical_id,
-        item_code=item_code,
-        shop_name=shop_name,
-        raw_price=raw_price,
-        shipping_cost=shipping,
-        point_rate=point_rate,
-        protein_cost=protein_cost,
-        item_url=item_url,
-        item_name=item_name,
-        image_url=image_url,
+        item_code=raw.item_code,
+        shop_name=raw.shop_name,
+        raw_price=raw.raw_price,
+        shipping_cost=scored.shipping_cost,
+        point_rate=scored.point_rate,
+        protein_cost=scored.protein_cost,
+        item_url=str(raw.item.get("itemUrl", "")).strip(),
+        item_name=raw.item_name,
+        image_url=pick_best_image_url(raw.item),
     )
 
 
-def classify_item_filter(master: MasterItem, item: Dict[str, Any], seen_keys: set) -> Tuple[Optional[OfferRow], Optional[str]]:
-    item_code = str(item.get("itemCode", "")).strip()
-    shop_name = str(item.get("shopName", "")).strip()
-    raw_price = safe_int(item.get("itemPrice", 0), 0)
-    item_name = str(item.get("itemName", "")).strip()
-
-    if not item_code or not shop_name or raw_price <= 0:
+def classify_item_filter(
+    master: MasterItem, raw: RawItem, seen_keys: set
+) -> Tuple[Optional[ScoredItem], Optional[str]]:
+    """
+    Returns (scored, None) for an accepted item or (None, drop_reason).
+    `seen_keys` holds (item_code, shop_name) for the current master/day and is updated on accept.
+    """
+    if not raw.item_code or not raw.shop_name or raw.raw_price <= 0:
         return None, "missing_required_or_invalid_price"
-    if looks_like_garbage(item_name):
+    if looks_like_garbage(raw.item_name):
         return None, "excluded_keyword"
-    if not capacity_strict_match(master, item_name):
+    if not capacity_strict_match(master, raw.item_name):
         return None, "capacity_mismatch"
 
-    offer = compute_offer(master, item)
-    if not offer:
-        return None, "invalid_offer"
-
-    key = (offer.date, offer.canonical_id, offer.item_code, offer.shop_name)
+    # date and canonical_id are fixed within one master's run; check before the cost arithmetic
+    key = (raw.item_code, raw.shop_name)
     if key in seen_keys:
         return None, "duplicate"
 
-    return offer, None
+    scored = compute_offer(master, raw)
+    if not scored:
+        return None, "invalid_offer"
+    seen_keys.add(key)
+
+    return scored, None
 
 
 # =========================
@@ -1356,11 +1654,12 @@ def main():
     print("ENDPOINT:", RAKUTEN_ENDPOINT)
     today = jst_today_str()
     yesterday = (jst_date() - timedelta(days=1)).isoformat()
+    variant_info = choose_variant_jst()
 
-    master_ws, hist_ws, min_ws, catalog_ws, query_ws = open_sheets()
+    master_values, hist_ws, min_ws, catalog_ws, query_ws = open_sheets()
     new_catalog_count, catalog_update_info = update_catalog_from_query_list(catalog_ws, query_ws)
     print(f"INFO catalog: appended_count={new_catalog_count} info={catalog_update_info}")
-    masters_all = read_master(master_ws)
+    masters_all = read_master(master_values)
     if not masters_all:
         raise RuntimeError("Master_List is empty or missing required columns.")
 
@@ -1391,8 +1690,14 @@ def main():
             discord_notify("⚠️ Catalog tracking fallback", detail_lines)
             masters = masters_all
 
-    yesterday_track_count = read_yesterday_tracked_count_from_history(hist_ws, yesterday)
-    today_track_count = len({m.canonical_id for m in masters})
+    # Only this run's canonical_ids are looked up in the history/summary minima
+    master_cids = frozenset(m.canonical_id for m in masters)
+
+    # One Price_History read per run, shared by the track-count check and the marketing reports
+    hist_values = hist_ws.get_all_values()
+    daily_min_by_cid = read_price_history_all_daily_min(hist_values, master_cids)
+    yesterday_track_count = read_yesterday_tracked_count_from_history(hist_values, yesterday)
+    today_track_count = len(master_cids)
     is_drop, drop_message = evaluate_track_drop(today_track_count, yesterday_track_count)
     if is_drop:
         discord_notify("⚠️ Track target count dropped sharply", [drop_message])
@@ -1400,16 +1705,19 @@ def main():
             raise RuntimeError(f"TRACK_DROP_ENFORCE=true: {drop_message}")
         print(f"WARNING track: {drop_message}")
 
-    # Read minima from Min_Summary only (fast)
-    yday_min = read_min_summary(min_ws, yesterday)   # {cid: (cost, shop, url)}
-    alltime_min = read_alltime_min(min_ws)          # {cid: (cost, shop, url)}
+    # Read minima from Min_Summary only (fast): one sheet read shared by the readers and the upsert
+    min_values = load_min_summary(min_ws)
+    yday_min, alltime_min = read_min_summaries(min_values, yesterday, master_cids)   # {cid: (cost, shop, url)} each
+    min_row_index = build_min_summary_row_index(min_values)
 
     all_offers: List[OfferRow] = []
     daily_bests: List[OfferRow] = []
     notify_payloads: List[Tuple[str, List[str]]] = []
     marketing_reports: List[Tuple[MasterItem, OfferRow, PriceChangeReport, ChangeFlags]] = []
+    today_mins: List[Tuple[str, str, float, str, str]] = []
     run_errors: List[str] = []
 
+    fetch_targets: List[MasterItem] = []
     for m in masters:
         if m.capacity_kg <= 0 or m.protein_ratio <= 0:
             print(
@@ -1419,11 +1727,10 @@ def main():
                 f"protein_ratio={m.protein_ratio}",
             )
             continue
+        fetch_targets.append(m)
 
-        time.sleep(REQUEST_SLEEP_SEC)
-
-        # Fetch many, then compute effective cost and keep best STORE_HITS
-        items, api_total_count = rakuten_search_multi_pages(m.search_keyword, total_hits=FETCH_HITS)
+    # Fetch many (in parallel across masters), then compute effective cost and keep best STORE_HITS
+    for m, (items, api_total_count) in iter_master_items(fetch_targets):
         print(
             "DEBUG fetch:",
             f"canonical_id={m.canonical_id}",
@@ -1433,8 +1740,11 @@ def main():
             f"sample={(items[0].get('itemName', '')[:60] if items else 'NONE')}",
         )
 
-        seen = set()  # (date,cid,item_code,shop_name)
-        offers_for_this: List[OfferRow] = []
+        seen = set()  # (item_code, shop_name)
+        # Bounded max-heap of the STORE_HITS cheapest so far: (-protein_cost, -arrival, scored).
+        # Ties keep the earlier item, same as heapq.nsmallest.
+        store_heap: List[Tuple[float, int, ScoredItem]] = []
+        accepted_before_store_limit = 0
         filter_drop_counts: Dict[str, int] = {
             "missing_required_or_invalid_price": 0,
             "excluded_keyword": 0,
@@ -1444,16 +1754,18 @@ def main():
         }
 
         for it in items:
-            offer, dropped_reason = classify_item_filter(m, it, seen)
-            if not offer:
+            scored, dropped_reason = classify_item_filter(m, parse_raw_item(it), seen)
+            if not scored:
                 if dropped_reason:
                     filter_drop_counts[dropped_reason] += 1
                 continue
-            key = (offer.date, offer.canonical_id, offer.item_code, offer.shop_name)
-            seen.add(key)
-            offers_for_this.append(offer)
+            accepted_before_store_limit += 1
+            entry = (-scored.protein_cost, -accepted_before_store_limit, scored)
+            if len(store_heap) < STORE_HITS:
+                heapq.heappush(store_heap, entry)
+            elif store_heap and scored.protein_cost < -store_heap[0][0]:
+                heapq.heapreplace(store_heap, entry)
 
-        accepted_before_store_limit = len(offers_for_this)
         dropped_by_store_limit = max(0, accepted_before_store_limit - STORE_HITS)
         filter_drop_counts["store_hits_limit"] = dropped_by_store_limit
 
@@ -1462,12 +1774,11 @@ def main():
             f"canonical_id={m.canonical_id}",
             f"input_items={len(items)}",
             f"accepted_before_store_limit={accepted_before_store_limit}",
-            "drop_counts=" + json.dumps(filter_drop_counts, ensure_ascii=False),
+            f"drop_counts={json.dumps(filter_drop_counts, ensure_ascii=False)}",
         )
 
-        # Sort by effective cost (protein_cost) and keep top STORE_HITS
-        offers_for_this.sort(key=lambda x: x.protein_cost)
-        offers_for_this = offers_for_this[:STORE_HITS]
+        # store_heap holds the STORE_HITS cheapest; emit them cheapest first
+        offers_for_this = [build_offer_row(m, s, today) for _, _, s in sorted(store_heap, reverse=True)]
 
         # Append to history buffer
         all_offers.extend(offers_for_this)
@@ -1476,7 +1787,8 @@ def main():
         if offers_for_this:
             best = offers_for_this[0]
             daily_bests.append(best)
-            ranking_offers = offers_for_this[:RANKING_N]
+            # offers_for_this is already sorted and not modified afterwards; only copy when trimming
+            ranking_offers = offers_for_this if len(offers_for_this) <= RANKING_N else offers_for_this[:RANKING_N]
             if best.image_url:
                 print(f"INFO selected best_offer.image_url canonical_id={m.canonical_id} url={best.image_url}")
             else:
@@ -1488,14 +1800,22 @@ def main():
             a_best = alltime_min.get(m.canonical_id)
             change_flags = detect_changes(best, y_best, a_best)
 
-            upsert_today_min(min_ws, today, m.canonical_id, best.protein_cost, best.shop_name, best.item_url)
+            today_mins.append((today, m.canonical_id, best.protein_cost, best.shop_name, best.item_url))
 
             if change_flags.has_change:
                 marketing_reports.append(
                     (
                         m,
                         best,
-                        build_marketing_report(m, best, hist_ws, today, yesterday, ranking_offers=ranking_offers),
+                        build_marketing_report(
+                            m,
+                            best,
+                            daily_min_by_cid.get(m.canonical_id, {}),
+                            today,
+                            yesterday,
+                            ranking_offers=ranking_offers,
+                            variant_info=variant_info,
+                        ),
                         change_flags,
                     )
                 )
@@ -1514,12 +1834,11 @@ def main():
                 if a_best:
                     lines.append(f"- 過去最安: {a_best[1]} / {a_best[0]:,.0f}円")
 
-                lines.append("")
-                lines.append("Top3:")
-                for i, o in enumerate(top3, 1):
-                    lines.append(
-                        f"{i}. {o.shop_name} / {o.protein_cost:,.0f}円 (価格{o.raw_price:,}+送料{o.shipping_cost:,}, pt{o.point_rate*100:.1f}%)"
-                    )
+                lines.extend(["", "Top3:"])
+                lines.extend(
+                    f"{i}. {o.shop_name} / {o.protein_cost:,.0f}円 (価格{o.raw_price:,}+送料{o.shipping_cost:,}, pt{o.point_rate*100:.1f}%)"
+                    for i, o in enumerate(top3, 1)
+                )
 
                 if change_flags.new_alltime_low:
                     title = "【過去最安更新】"
@@ -1529,6 +1848,9 @@ def main():
                     title = "【実質コスト変化】"
                 notify_payloads.append((f"{title} {m.canonical_id} ({today})", lines))
 
+    # Flush Min_Summary upserts in one batch
+    upsert_today_mins(min_ws, today_mins, min_row_index)
+
     # Write to Price_History
     print(f"DEBUG append: rows_to_append={len(all_offers)}")
     if len(all_offers) == 0:
@@ -1537,77 +1859,95 @@ def main():
             raise RuntimeError(f"STRICT_MODE=true: {msg}")
         print(f"WARNING: {msg} STRICT_MODE=false so run is treated as success.")
 
-    append_history(hist_ws, all_offers)
+    append_history(hist_ws, all_offers, hist_values)
 
-    daily_hatena_result = HatenaPostResult(ok=True, status_code=None, endpoint="", message="skipped")
-    if daily_bests:
-        daily_bests.sort(key=lambda x: x.protein_cost)
-        daily_ranking_markdown = build_top3_markdown(daily_bests)
-        daily_hatena_result = post_top3_to_hatena(daily_ranking_markdown)
-        print(
-            f"INFO hatena: daily ranking post ok={daily_hatena_result.ok} "
-            f"status={daily_hatena_result.status_code} endpoint={daily_hatena_result.endpoint}"
-        )
-        if not daily_hatena_result.ok:
-            run_errors.append(
-                "Hatena daily ranking draft post failed "
-                f"(status={daily_hatena_result.status_code}, endpoint={daily_hatena_result.endpoint}): "
-                f"{daily_hatena_result.message}"
+    # Hatena drafts go out on a single background worker (keeps post order) while Discord is notified
+    hatena_ex = ThreadPoolExecutor(max_workers=1)
+    # shutdown() waits for queued drafts even if building a report or notifying raises
+    try:
+        daily_hatena_result = HatenaPostResult(ok=True, status_code=None, endpoint="", message="skipped")
+        daily_hatena_future = None
+        if daily_bests:
+            # Only the TOP3 is rendered
+            top3_bests = heapq.nsmallest(3, daily_bests, key=lambda x: x.protein_cost)
+            daily_ranking_markdown = build_top3_markdown(top3_bests)
+            daily_hatena_future = hatena_ex.submit(post_top3_to_hatena, daily_ranking_markdown)
+        else:
+            print("WARNING hatena: skipped daily ranking post because daily_bests is empty")
+
+        # Send notifications
+        discord_notify_many(notify_payloads)
+
+        if daily_hatena_future is not None:
+            daily_hatena_result = daily_hatena_future.result()
+            print(
+                f"INFO hatena: daily ranking post ok={daily_hatena_result.ok} "
+                f"status={daily_hatena_result.status_code} endpoint={daily_hatena_result.endpoint}"
             )
-    else:
-        print("WARNING hatena: skipped daily ranking post because daily_bests is empty")
-
-    # Send notifications
-    for title, lines in notify_payloads:
-        discord_notify(title, lines)
-
-    # Generate and notify posting drafts only for changed products
-    hatena_result = HatenaPostResult(ok=True, status_code=None, endpoint="", message="skipped")
-    for m, best, report, change_flags in marketing_reports:
-        diff_line = (
-            f"{report.diff_yen:+,}円 ({report.diff_pct:+.1f}%)"
-            if report.diff_yen is not None and report.diff_pct is not None
-            else "データ不足"
-        )
-        lines = [
-            f"- product: {m.canonical_id} / {m.search_keyword or m.brand}",
-            f"- today(実質): {report.today_protein_cost:,.0f}円/kg",
-            f"- today(価格): {report.today_raw_price:,}円",
-            f"- 前日比: {diff_line}",
-            f"- 30日最安: {'更新' if report.is_30d_low else '未更新'}"
-            + (f" ({report.min_30d_protein_cost:,.0f}円/kg)" if report.min_30d_protein_cost is not None else ""),
-            f"- level: {report.level}",
-            f"- variant: {report.variant} ({report.date_jst} {report.weekday_jst})",
-            f"- image: {'採用' if report.image_selected else '未取得'}",
-            f"- change: shop={'あり' if change_flags.changed_shop else 'なし'} / min_cost={'あり' if change_flags.changed_min_cost else 'なし'} / alltime={'更新' if change_flags.new_alltime_low else '未更新'}",
-            "",
-            "[X投稿案]",
-            report.x_text,
-            "",
-            "[Hatena投稿Markdown案]",
-            report.hatena_markdown[:1200],
+            if not daily_hatena_result.ok:
+                run_errors.append(
+                    "Hatena daily ranking draft post failed "
+                    f"(status={daily_hatena_result.status_code}, endpoint={daily_hatena_result.endpoint}): "
+                    f"{daily_hatena_result.message}"
+                )
+
+        # Generate and notify posting drafts only for changed products
+        hatena_result = HatenaPostResult(ok=True, status_code=None, endpoint="", message="skipped")
+        # Queue every draft first; the Discord previews below go out while Hatena works through them
+        hatena_futures = [
+            hatena_ex.submit(post_top3_to_hatena, report.hatena_markdown) for _, _, report, _ in marketing_reports
         ]
-        discord_notify("📝 投稿案通知（Rakuten Protein Tracker）", lines)
+        draft_payloads: List[Tuple[str, List[str]]] = []
+        for m, best, report, change_flags in marketing_reports:
+            diff_line = (
+                f"{report.diff_yen:+,}円 ({report.diff_pct:+.1f}%)"
+                if report.diff_yen is not None and report.diff_pct is not None
+                else "データ不足"
+            )
+            lines = [
+                f"- product: {m.canonical_id} / {m.search_keyword or m.brand}",
+                f"- today(実質): {report.today_protein_cost:,.0f}円/kg",
+                f"- today(価格): {report.today_raw_price:,}円",
+                f"- 前日比: {diff_line}",
+                f"- 30日最安: {'更新' if report.is_30d_low else '未更新'}"
+                + (f" ({report.min_30d_protein_cost:,.0f}円/kg)" if report.min_30d_protein_cost is not None else ""),
+                f"- level: {report.level}",
+                f"- variant: {report.variant} ({report.date_jst} {report.weekday_jst})",
+                f"- image: {'採用' if report.image_selected else '未取得'}",
+                f"- change: shop={'あり' if change_flags.changed_shop else 'なし'} / min_cost={'あり' if change_flags.changed_min_cost else 'なし'} / alltime={'更新' if change_flags.new_alltime_low else '未更新'}",
+                "",
+                "[X投稿案]",
+                report.x_text,
+                "",
+                "[Hatena投稿Markdown案]",
+                report.hatena_markdown[:1200],
+            ]
+            draft_payloads.append(("📝 投稿案通知（Rakuten Protein Tracker）", lines))
 
-        print(
-            "INFO marketing:",
-            f"variant={report.variant}",
-            f"date_jst={report.date_jst}",
-            f"weekday_jst={report.weekday_jst}",
-            f"image_url_status={'採用' if report.image_selected else '未取得'}",
-            f"persona枠数={report.persona_slot_count}",
-            f"persona文字数={report.persona_section_chars}",
-        )
+            print(
+                "INFO marketing:",
+                f"variant={report.variant}",
+                f"date_jst={report.date_jst}",
+                f"weekday_jst={report.weekday_jst}",
+                f"image_url_status={'採用' if report.image_selected else '未取得'}",
+                f"persona枠数={report.persona_slot_count}",
+                f"persona文字数={report.persona_section_chars}",
+            )
 
-        hatena_result = post_top3_to_hatena(report.hatena_markdown)
-        print(
-            f"INFO hatena: marketing draft post ok={hatena_result.ok} "
-            f"status={hatena_result.status_code} endpoint={hatena_result.endpoint}"
-        )
-        if not hatena_result.ok:
-            run_errors.append(
-                f"Hatena draft post failed (status={hatena_result.status_code}, endpoint={hatena_result.endpoint}): {hatena_result.message}"
+        discord_notify_many(draft_payloads)
+
+        for hatena_future in hatena_futures:
+            hatena_result = hatena_future.result()
+            print(
+                f"INFO hatena: marketing draft post ok={hatena_result.ok} "
+                f"status={hatena_result.status_code} endpoint={hatena_result.endpoint}"
             )
+            if not hatena_result.ok:
+                run_errors.append(
+                    f"Hatena draft post failed (status={hatena_result.status_code}, endpoint={hatena_result.endpoint}): {hatena_result.message}"
+                )
+    finally:
+        hatena_ex.shutdown()
 
     summary_lines = [
         f"- date: {today}",
@@ -1625,8 +1965,7 @@ def main():
     ]
     if run_errors:
         summary_lines.append("- errors:")
-        for err in run_errors:
-            summary_lines.append(f"  - {err[:300]}")
+        summary_lines.extend(f"  - {err[:300]}" for err in run_errors)
 
     discord_notify("📊 Rakuten protein tracker summary", summary_lines)
 
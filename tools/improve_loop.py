@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import os
+import re
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
@@ -13,6 +14,21 @@ DONE_LABEL = "done"
 BLOCKED_LABEL = "blocked"
 
 
+def keyword_pattern(words: List[str]) -> "re.Pattern[str]":
+    return re.compile("|".join(re.escape(w) for w in words))
+
+
+# score_issue のキーワード判定（lower() 済みのテキストに対して search する）
+IMPACT_CONVERSION_RE = keyword_pattern(["cv", "cvr", "売上", "収益", "購入", "cta", "離脱", "コンバージョン"])
+IMPACT_SEVERITY_RE = keyword_pattern(["致命", "大きい", "全ユーザー", "モバイル", "タップしづらい"])
+EFFORT_SMALL_RE = keyword_pattern(["文言", "css", "レイアウト", "配置", "表示", "markdown"])
+EFFORT_LARGE_RE = keyword_pattern(["全面", "設計変更", "DB", "マイグレーション", "複数画面"])
+RISK_LOW_RE = keyword_pattern(["文言", "css", "表示", "markdown", "小修正"])
+RISK_HIGH_RE = keyword_pattern(["決済", "認証", "在庫", "計算", "検索ロジック"])
+MEASURABLE_POS_RE = keyword_pattern(["クリック", "ctr", "cvr", "タップ", "確認", "再現", "比較"])
+MEASURABLE_NEG_RE = keyword_pattern(["なんとなく", "違和感", "気がする"])
+
+
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
@@ -81,11 +97,6 @@ def clamp_score(n: int) -> int:
     return max(1, min(5, n))
 
 
-def contains_any(text: str, words: List[str]) -> bool:
-    lowered = text.lower()
-    return any(w in lowered for w in words)
-
-
 def parse_first_line_expectation(body: str) -> Tuple[bool, Optional[str]]:
     first_line = (body or "").splitlines()[0].strip() if body else ""
     if "→" in first_line:
@@ -97,6 +108,7 @@ def score_issue(issue: Dict) -> Evaluation:
     title = issue.get("title", "")
     body = issue.get("body", "") or ""
     full_text = f"{title}\n{body}"
+    lowered = full_text.lower()
 
     ok_format, first_line = parse_first_line_expectation(body)
     missing_info: List[str] = []
@@ -109,27 +121,27 @@ def score_issue(issue: Dict) -> Evaluation:
         questions.append("1行目を『症状 → 期待』の形式で記載してください。")
 
     impact = 3
-    if contains_any(full_text, ["cv", "cvr", "売上", "収益", "購入", "cta", "離脱", "コンバージョン"]):
+    if IMPACT_CONVERSION_RE.search(lowered):
         impact += 1
-    if contains_any(full_text, ["致命", "大きい", "全ユーザー", "モバイル", "タップしづらい"]):
+    if IMPACT_SEVERITY_RE.search(lowered):
         impact += 1
 
     effort = 3
-    if contains_any(full_text, ["文言", "css", "レイアウト", "配置", "表示", "markdown"]):
+    if EFFORT_SMALL_RE.search(lowered):
         effort += 1
-    if contains_any(full_text, ["全面", "設計変更", "DB", "マイグレーション", "複数画面"]):
+    if EFFORT_LARGE_RE.search(lowered):
         effort -= 2
 
     risk = 3
-    if contains_any(full_text, ["文言", "css", "表示", "markdown", "小修正"]):
+    if RISK_LOW_RE.search(lowered):
         risk += 1
-    if contains_any(full_text, ["決済", "認証", "在庫", "計算", "検索ロジック"]):
+    if RISK_HIGH_RE.search(lowered):
         risk -= 2
 
     measurable = 3
-    if contains_any(full_text, ["クリック", "ctr", "cvr", "タップ", "確認", "再現", "比較"]):
+    if MEASURABLE_POS_RE.search(lowered):
         measurable += 1
-    if contains_any(full_text, ["なんとなく", "違和感", "気がする"]):
+    if MEASURABLE_NEG_RE.search(lowered):
         measurable -= 1
 
     score = ScoreCard(
@@ -156,6 +168,38 @@ def score_issue(issue: Dict) -> Evaluation:
     )
 
 
+CODEX_PROMPT_TEMPLATE = "\n".join(
+    [
+        "あなたはこのリポジトリ（protein-hunter）の実装担当です。",
+        "対象Issue: #{number} {title}",
+        "",
+        "【背景（現状の問題）】",
+        "{background}",
+        "",
+        "【期待する挙動（Acceptance Criteria）】",
+        "- {acceptance}",
+        "- 既存機能を壊さず、該当箇所のみ最小変更で修正すること",
+        "",
+        "【影響範囲（安全に進めるための制約）】",
+        "- 主に Markdown / CSS / 文言修正を優先すること",
+        "- ロジック改修が必要な場合は影響範囲を明示し、最小変更で実施すること",
+        "",
+        "【実装方針】",
+        "- まずIssueの症状に対応する関数・テンプレート・出力箇所を探索する",
+        "- 関連する生成テキスト（記事本文、CTA、通知文）の差分を確認して修正する",
+        "- 必要に応じてテストや検証スクリプトを更新する",
+        "",
+        "【変更後の確認方法】",
+        "- はてな投稿向けMarkdownを生成して見た目崩れがないことを確認する",
+        "- Discord通知文面に必要情報が出ることを確認する",
+        "- 実行ログにエラーがないことを確認する",
+        "",
+        "Issue詳細:",
+        "{body}",
+    ]
+)
+
+
 def build_codex_prompt(evaluation: Evaluation) -> str:
     issue = evaluation.issue
     title = issue.get("title", "")
@@ -164,35 +208,12 @@ def build_codex_prompt(evaluation: Evaluation) -> str:
 
     acceptance = first_line if "→" in first_line else "症状を解消し、期待結果を満たすこと"
 
-    return "\n".join(
-        [
-            "あなたはこのリポジトリ（protein-hunter）の実装担当です。",
-            f"対象Issue: #{issue.get('number')} {title}",
-            "",
-            "【背景（現状の問題）】",
-            f"{first_line or 'Issue本文を参照し、現状の問題を具体化してください。'}",
-            "",
-            "【期待する挙動（Acceptance Criteria）】",
-            f"- {acceptance}",
-            "- 既存機能を壊さず、該当箇所のみ最小変更で修正すること",
-            "",
-            "【影響範囲（安全に進めるための制約）】",
-            "- 主に Markdown / CSS / 文言修正を優先すること",
-            "- ロジック改修が必要な場合は影響範囲を明示し、最小変更で実施すること",
-            "",
-            "【実装方針】",
-            "- まずIssueの症状に対応する関数・テンプレート・出力箇所を探索する",
-            "- 関連する生成テキスト（記事本文、CTA、通知文）の差分を確認して修正する",
-            "- 必要に応じてテストや検証スクリプトを更新する",
-            "",
-            "【変更後の確認方法】",
-            "- はてな投稿向けMarkdownを生成して見た目崩れがないことを確認する",
-            "- Discord通知文面に必要情報が出ることを確認する",
-            "- 実行ログにエラーがないことを確認する",
-            "",
-            "Issue詳細:",
-            body if body.strip() else "（Issue本文なし）",
-        ]
+    return CODEX_PROMPT_TEMPLATE.format(
+        number=issue.get("number"),
+        title=title,
+        background=first_line or "Issue本文を参照し、現状の問題を具体化してください。",
+        acceptance=acceptance,
+        body=body if body.strip() else "（Issue本文なし）",
     )
 
 
@@ -274,7 +295,7 @@ def main() -> None:
     non_blocked = [e for e in evaluations if not e.blocked]
 
     if non_blocked:
-        selected = sorted(non_blocked, key=lambda e: e.score.total, reverse=True)[0]
+        selected = max(non_blocked, key=lambda e: e.score.total)
         prompt = build_codex_prompt(selected)
         message = build_discord_message(selected, prompt)
 